@@ -0,0 +1,173 @@
+import json
+from functools import lru_cache
+
+from config import geography_levels, geography_location_columns, county_geojson_path, establishment_attributes, \
+    establishment_ratio_attributes, area_ratio_attributes, area_weight_attributes, default_area_weight_attribute, \
+    area_attribute_levels, default_area_attribute_level
+
+
+def get_available_levels(target_df):
+    """
+    Used to find the geography levels that can be displayed for a dataframe
+    :param target_df: the dataframe containing the data of the finest geography level
+    :return: list of the geography levels (coarsest first) for which target_df contains a column
+    """
+    return [level for level in geography_levels if level in target_df.columns]
+
+
+def add_region_column(target_df, state_regions_df):
+    """
+    Used to add the "Region" of each State to a dataframe, if it does not already contain it
+    :param target_df: the dataframe containing a "State" column
+    :param state_regions_df: the dataframe mapping each "State" to its "Region" (state_regions.csv)
+    :return: target_df including a "Region" column
+    """
+    if "Region" in target_df.columns:
+        return target_df
+
+    return target_df.merge(state_regions_df[["State", "Region"]], on="State", how="left")
+
+
+def build_location_mappings(target_df):
+    """
+    Used to map the areas of each geography level to the locations used to draw them on the map.
+    E.g. a Region is drawn using the "State code" of each of its states.
+    :param target_df: the dataframe containing the data of the finest geography level
+    :return: dictionary mapping each available geography level to a dataframe of its (area, location) pairs
+    """
+    mappings = {}
+    for level in get_available_levels(target_df):
+        location_column = geography_location_columns[level]
+        mappings[level] = target_df[[level, location_column]].drop_duplicates().reset_index(drop=True)
+
+    return mappings
+
+
+def build_aggregation_levels(target_df):
+    """
+    Used to pre-aggregate the data for every available geography level. The "Business size" dimension is kept, so
+    that the establishment size filter can still be applied within the callbacks.
+    Each level is split into tiles, one per area of its parent level, so that drilling down into an area only loads
+    the rows of that area.
+    :param target_df: the dataframe containing the data of the finest geography level
+    :return: dictionary mapping each available geography level (coarsest first) to a dictionary that maps the
+    drill path of each parent area (tuple of area names, starting from the coarsest level) to its dataframe tile
+    """
+    levels = get_available_levels(target_df)
+    aggregated_dfs = {}
+
+    # The finest level is aggregated from the original rows. The establishment attributes are summed (and the ratios
+    # derived from them are recomputed), while every other attribute describes the area as a whole, so its first value
+    # is used.
+    finest_level = levels[-1]
+    aggregation = {column: "sum" if column in establishment_attributes else "first"
+                   for column in target_df.columns if column not in levels + ["Business size"]}
+    aggregated_dfs[finest_level] = _add_ratios(
+        target_df.groupby(levels + ["Business size"], as_index=False).agg(aggregation), establishment_ratio_attributes)
+
+    # Every coarser level is rolled up from the level right below it
+    for i in range(len(levels) - 2, -1, -1):
+        aggregated_dfs[levels[i]] = _roll_up(aggregated_dfs[levels[i + 1]], levels[i + 1], levels[:i + 1])
+
+    tiled_levels = {}
+    for i, level in enumerate(levels):
+        tiled_levels[level] = _split_into_tiles(aggregated_dfs[level], levels[:i])
+
+    return tiled_levels
+
+
+def select_area(tiled_levels, drill_path):
+    """
+    Used to retrieve the data of the areas within the selected area, at the geography level right below it
+    :param tiled_levels: the pre-aggregated geography levels, as returned by build_aggregation_levels()
+    :param drill_path: list of the selected areas, one per geography level starting from the coarsest one
+    :return: tuple of the geography level to display and its dataframe tile within the selected area
+    """
+    levels = list(tiled_levels)
+    level = levels[len(drill_path)]
+
+    # An area without any data (e.g. a Region without any establishments) results in an empty tile
+    empty_tile = next(iter(tiled_levels[level].values())).iloc[0:0]
+
+    return level, tiled_levels[level].get(tuple(drill_path), empty_tile)
+
+
+@lru_cache(maxsize=None)
+def load_county_geojson():
+    """
+    Used to load the county boundaries, only the first time the "County" level is displayed
+    :return: the GeoJSON dictionary of the county boundaries
+    """
+    with open(county_geojson_path) as geojson_file:
+        return json.load(geojson_file)
+
+
+def _roll_up(finer_df, finer_level, keys):
+    # Establishment attributes are summed per business size, and the ratios derived from them are recomputed
+    summed_columns = [column for column in establishment_attributes if column in finer_df.columns]
+    establishments_df = finer_df.groupby(keys + ["Business size"], as_index=False)[summed_columns].sum()
+    establishments_df = _add_ratios(establishments_df, establishment_ratio_attributes)
+
+    # Every other attribute describes a finer area as a whole, so a single row is kept per finer area, along with its
+    # establishment totals over all business sizes. Non-numeric attributes (e.g. "Most popular degree field") do not
+    # describe the coarser area, so they are dropped.
+    area_columns = [column for column in finer_df.select_dtypes(include="number").columns
+                    if column not in summed_columns + keys and column not in establishment_ratio_attributes]
+    aggregation = {column: "first" for column in area_columns}
+    aggregation.update({column: "sum" for column in summed_columns})
+    areas_df = finer_df.groupby(keys + [finer_level], as_index=False).agg(aggregation)
+
+    # Attributes measured at a coarser level than finer_level are copies of the same value within each coarser area
+    # (e.g. the degree holders of a State on each of its counties), so they are taken once instead of being summed
+    copied_columns = [column for column in area_columns
+                      if geography_levels.index(finer_level) >
+                      geography_levels.index(area_attribute_levels.get(column, default_area_attribute_level))]
+    rolled_up_df = areas_df.groupby(keys, as_index=False)[copied_columns].first()
+
+    # Counts ("#" attributes) are summed and the area ratios are recomputed from them. Any other attribute is averaged
+    # over the finer areas, weighted by its area weight attribute (or unweighted, if the dataset does not contain it).
+    count_columns = [column for column in area_columns + summed_columns
+                     if column.startswith("#") and column not in copied_columns]
+    rolled_up_df = rolled_up_df.merge(areas_df.groupby(keys, as_index=False)[count_columns].sum(), on=keys)
+    rolled_up_df = _add_ratios(rolled_up_df, area_ratio_attributes)
+
+    for column in area_columns:
+        if column in rolled_up_df.columns:
+            continue
+
+        weight_attribute = area_weight_attributes.get(column, default_area_weight_attribute)
+        if weight_attribute in areas_df.columns:
+            # Finer areas missing the value (e.g. no ranked universities) do not count towards the weights
+            weights = areas_df[weight_attribute].where(areas_df[column].notna(), 0)
+        else:
+            weights = areas_df[column].notna().astype(int)
+        grouped_weights = weights.groupby([areas_df[key] for key in keys])
+        weighted_values = (areas_df[column].fillna(0) * weights).groupby([areas_df[key] for key in keys])
+        rolled_up_df[column] = (weighted_values.sum() / grouped_weights.sum()).values
+
+    return establishments_df.merge(rolled_up_df[keys + area_columns], on=keys)
+
+
+def _add_ratios(target_df, ratio_attributes):
+    # Recompute every ratio whose numerator and denominator are available in target_df
+    for column, (numerator, denominator) in ratio_attributes.items():
+        if numerator in target_df.columns and denominator in target_df.columns:
+            target_df[column] = target_df[numerator] / target_df[denominator]
+
+    return target_df
+
+
+def _split_into_tiles(level_df, parent_levels):
+    if not parent_levels:
+        return {(): level_df}
+
+    # A single parent level is grouped by its name, since pandas only returns tuple keys when grouping by several
+    grouper = parent_levels if len(parent_levels) > 1 else parent_levels[0]
+
+    tiles = {}
+    for parent_areas, tile_df in level_df.groupby(grouper):
+        if not isinstance(parent_areas, tuple):
+            parent_areas = (parent_areas,)
+        tiles[parent_areas] = tile_df.reset_index(drop=True)
+
+    return tiles
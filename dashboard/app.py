@@ -1,36 +1,42 @@
-import json
 import warnings
 
+# Import the app first, so that its startup timer also covers the import of Dash and pandas
+from main import app
 import pandas as pd
-import plotly.express as px
-from dash import html, dcc
+from dash import html, dcc, ctx, no_update
 
-from config import focused_attributes, def_state_ranking_weights
-from main import app
+from aggregation import add_region_column, build_aggregation_levels, build_location_mappings, load_county_geojson, \
+    select_area
+from config import def_state_ranking_weights, geography_levels, geography_location_columns, \
+    state_regions_path
 from views.menu import make_menu_layout
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+
+# The figures are only built by the callbacks of the first page load, so plotly.express (which is heavy to import) is
+# only imported within the functions that build them, after the server has started.
+# Use "python -X importtime app.py" to get an import-time report of the dashboard's startup.
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
-def enhance_df_with_state_ranking_score(target_df, score_weights):
-    # Aggregate target_df to calculate the sum of #Establishments per State (regardless of business size)
-    grouped_agg_df = target_df.groupby('State')['#Establishments'].sum()
+def enhance_df_with_state_ranking_score(target_df, score_weights, geo_column="State"):
+    # Aggregate target_df to calculate the sum of #Establishments per area (regardless of business size)
+    grouped_agg_df = target_df.groupby(geo_column)['#Establishments'].sum()
 
     # Converting grouped, aggregated DataFrame to a dictionary
     state_establishment_count = grouped_agg_df.to_dict()
 
-    # Aggregate target_df to retrieve the "Bachelor's Degree Holders" value per State, using the "first" aggregation
-    grouped_agg_df = target_df.groupby('State')['#Bachelor\'s degree holders'].first()
+    # Aggregate target_df to retrieve the "Bachelor's Degree Holders" value per area, using the "first" aggregation
+    grouped_agg_df = target_df.groupby(geo_column)['#Bachelor\'s degree holders'].first()
 
     # Converting grouped, aggregated DataFrame to a dictionary
     state_degree_holders_count = grouped_agg_df.to_dict()
 
-    # Get all distinct State names from target_df
-    distinct_state_values = target_df['State'].unique()
+    # Get all distinct area names from target_df
+    distinct_state_values = target_df[geo_column].unique()
 
     # Create an empty score dataframe
-    score_df = pd.DataFrame(columns=["State", "State Ranking Score"])
+    score_df = pd.DataFrame(columns=[geo_column, "State Ranking Score"])
 
     for state in distinct_state_values:
         # Calculate the ranking score for the current state
@@ -38,10 +44,10 @@ def enhance_df_with_state_ranking_score(target_df, score_weights):
                 state_establishment_count[state] * score_weights["weight_2"]
 
         # Append the results to score_df
-        score_df = score_df.append({"State": state, "State Ranking Score": score}, ignore_index=True)
+        score_df = score_df.append({geo_column: state, "State Ranking Score": score}, ignore_index=True)
 
     # Merge target_df and score_df
-    merged_df = pd.merge(target_df, score_df, on='State')
+    merged_df = pd.merge(target_df, score_df, on=geo_column)
 
     # Sort merged_df in descending state ranking score order
     sorted_df = merged_df.sort_values("State Ranking Score", ascending=False)
@@ -55,17 +61,24 @@ def enhance_df_with_state_ranking_score(target_df, score_weights):
     return sorted_df
 
 
-def update_choropleth(target_df, focused_attribute):
+def update_choropleth(target_df, focused_attribute, level="State", location_df=None):
     """
     Used to update the choropleth figure
     :param target_df: the dataframe containing the data that will be used by the choropleth figure
     :param focused_attribute: the attribute of target_df we want to visualize on the choropleth
-    :param selected_establishment_sizes: list containing the selected establishment size strings
-    :param aggregation: string that defines the aggregation we want to apply to our data within the choropleth
+    :param level: the geography level of the areas contained in target_df
+    :param location_df: dataframe mapping the areas of level to their map locations, required if target_df does not
+    contain the location column of level (e.g. the "State code" of each Region)
     :return: a figure object representing the generated choropleth figure
     """
+    import plotly.express as px
+
     # Perform the required "sum" aggregations for specific attributes
-    target_df["#Establishments"] = target_df.groupby("State")["#Establishments"].transform("sum")
+    target_df["#Establishments"] = target_df.groupby(level)["#Establishments"].transform("sum")
+
+    location_column = geography_location_columns[level]
+    if location_column not in target_df.columns:
+        target_df = target_df.merge(location_df, on=level)
 
     # If the focused attribute is "State Ranking Score", inverse the continues color scale to achieve an appropriate
     # semantic meaning (rank 1 -> darker green, rank 45 -> lighter green)
@@ -74,64 +87,80 @@ def update_choropleth(target_df, focused_attribute):
     else:
         color_continuous_scale = "greens"
 
+    # States (and the Regions drawn through them) are located using the built-in USA states geometries, while
+    # counties require the county boundaries GeoJSON
+    if level == "County":
+        location_args = dict(geojson=load_county_geojson())
+    else:
+        location_args = dict(locationmode="USA-states")
 
     fig = px.choropleth(data_frame=target_df,
-                        locations="State code",
-                        locationmode="USA-states",
-                        hover_name="State",
+                        locations=location_column,
+                        hover_name=level,
                         scope="usa",
                         color=focused_attribute,
                         color_continuous_scale=color_continuous_scale,
+                        # The area name is used by the callbacks to drill down into (or filter on) the clicked area
+                        custom_data=[level],
                         hover_data=["#Establishments",
                                     '#Bachelor\'s degree holders',
                                     'Men to women degree holders ratio',
                                     '(Mid)Senior to total ratio',
-                                    '#(Mid)Senior degree holders']
+                                    '#(Mid)Senior degree holders'],
+                        **location_args
                         )
     fig.update_layout(margin=dict(t=0, r=0, l=0, b=0))
 
+    # Zoom in to the displayed areas, unless the whole country is displayed
+    if level != geography_levels[0]:
+        fig.update_geos(fitbounds="locations")
+
     return fig
 
 
-def update_scatter_plot(target_df):
+def update_scatter_plot(target_df, level="State"):
+    import plotly.express as px
+
     # Perform the required "sum" aggregations for specific attributes
-    target_df["#Establishments"] = target_df.groupby("State")["#Establishments"].transform("sum")
+    target_df["#Establishments"] = target_df.groupby(level)["#Establishments"].transform("sum")
+
+    hover_data = ["Region",
+                  "State",
+                  "#Establishments",
+                  '#Bachelor\'s degree holders',
+                  '#Science and Engineering degree holders',
+                  '#Science and Engineering Related Fields degree holders',
+                  '#Business degree holders',
+                  '#Education degree holders',
+                  '#Arts, Humanities and Others degree holders',
+                  'Men to women degree holders ratio',
+                  '(Mid)Senior to total ratio',
+                  '#(Mid)Senior degree holders']
 
     fig = px.scatter(target_df,
                      x="#Establishments",
                      y="#Bachelor\'s degree holders",
                      color="Region",
-                     hover_data=["Region",
-                                 "State",
-                                 "#Establishments",
-                                 '#Bachelor\'s degree holders',
-                                 '#Science and Engineering degree holders',
-                                 '#Science and Engineering Related Fields degree holders',
-                                 '#Business degree holders',
-                                 '#Education degree holders',
-                                 '#Arts, Humanities and Others degree holders',
-                                 'Men to women degree holders ratio',
-                                 '(Mid)Senior to total ratio',
-                                 '#(Mid)Senior degree holders']
+                     hover_name=level,
+                     # Coarser levels do not contain the columns of the finer ones (e.g. "State" for Regions)
+                     hover_data=[column for column in hover_data if column in target_df.columns]
                      )
 
     return fig
 
 
 if __name__ == '__main__':
-    # Read the data from the csv file
+    # Read the data from the csv file (county FIPS codes are read as strings to keep their leading zeros)
     cbp_df = pd.read_csv(
-        "../datasets/generated/final_preprocessed.csv", low_memory=False)
-
-    # Set the default focused attribute
-    default_focused_attr = focused_attributes[0]
+        "../datasets/generated/final_preprocessed.csv", low_memory=False, dtype={"County FIPS": str})
+    cbp_df = add_region_column(cbp_df, pd.read_csv(state_regions_path))
 
-    # Initialize choropleth figure - ATTENTION: Make sure to use a deep copy of the original dataset!
-    choropleth_fig = update_choropleth(cbp_df.copy(), default_focused_attr)
-
-    # Initialize scatterplot figure
-    scatterplot_fig = update_scatter_plot(cbp_df.copy())
+    # Pre-aggregate the data for every geography level, so that each callback only works on the tile of the
+    # currently selected area
+    geo_levels = build_aggregation_levels(cbp_df)
+    location_mappings = build_location_mappings(cbp_df)
 
+    # The choropleth and scatterplot figures are initialized by their callbacks, when the page is first loaded
     app.layout = html.Div(
         id="app-container",
         children=[
@@ -147,11 +176,19 @@ if __name__ == '__main__':
                 className="five columns",
                 children=[
                     html.H5('Map overview'),
+                    html.Div(
+                        children=[
+                            html.Button("Back", id="geography-drill-up", disabled=True),
+                            html.Label(id="geography-drill-path", style={"display": "inline", "margin-left": "10px"})
+                        ]
+                    ),
+                    # List of the areas drilled down into, one per geography level starting from the coarsest one
+                    dcc.Store(id="geography-drill-store", data=[]),
                     dcc.Loading(
                         id="loading-1",
                         type="default",
                         children=[html.Div(id="loading-output-choropleth"),
-                                  dcc.Graph(id="choropleth-mapbox", figure=choropleth_fig)]
+                                  dcc.Graph(id="choropleth-mapbox")]
                     ),
                 ]
             ),
@@ -167,7 +204,7 @@ if __name__ == '__main__':
                         id="loading-2",
                         type="default",
                         children=[html.Div(id="loading-output-scatter-plot"),
-                                  dcc.Graph(id='scatter-plot', figure=scatterplot_fig)]
+                                  dcc.Graph(id='scatter-plot')]
                     ),
                 ]
             )
@@ -191,53 +228,80 @@ if __name__ == '__main__':
     )
 
 
+    @app.callback(
+        Output("geography-drill-store", "data"),
+        Output("choropleth-mapbox", "clickData"),
+        Output("choropleth-mapbox", "selectedData"),
+        Input("choropleth-mapbox", "clickData"),
+        Input("geography-drill-up", "n_clicks"),
+        State("geography-drill-store", "data"))
+    def update_drill_path(click_data, n_clicks, drill_path):
+        if ctx.triggered_id == "geography-drill-up" and drill_path:
+            # Go back up to the parent area
+            drill_path = drill_path[:-1]
+        elif ctx.triggered_id == "choropleth-mapbox" and click_data and len(drill_path) + 1 < len(geo_levels):
+            # Drill down into the clicked area, unless the finest geography level is already displayed
+            drill_path = drill_path + [click_data["points"][0]["customdata"][0]]
+        else:
+            # Nothing to drill into, so keep the current map selection driving the scatter plot
+            return no_update, no_update, no_update
+
+        # Reset the click (so that clicking the same area again is registered) and the selection of the map, since
+        # it refers to the areas of the previous geography level
+        return drill_path, None, None
+
+
+    @app.callback(
+        Output("geography-drill-path", "children"),
+        Output("geography-drill-up", "disabled"),
+        Input("geography-drill-store", "data"))
+    def update_drill_path_view(drill_path):
+        level, _ = select_area(geo_levels, drill_path)
+        return "{} ({} level)".format(" > ".join(["USA"] + drill_path), level), not drill_path
+
+
     @app.callback(
         Output("choropleth-mapbox", "figure"),
         Output("loading-output-choropleth", "children"),
         Input("select-focused-attribute", "value"),
         Input("establishment-size-checklist", "value"),
         Input("score-weight-1", "value"),
-        Input("score-weight-2", "value"))
-    def update_choropleth_view(focused_attribute, selected_establishment_sizes, score_weight_1, score_weight_2):
-        # Create a deep copy of the original dataframe which can be freely modified for this callback
-        original_df = cbp_df.copy()
+        Input("score-weight-2", "value"),
+        Input("geography-drill-store", "data"))
+    def update_choropleth_view(focused_attribute, selected_establishment_sizes, score_weight_1, score_weight_2,
+                               drill_path):
+        # Create a deep copy of the selected area's tile which can be freely modified for this callback
+        level, area_df = select_area(geo_levels, drill_path)
+        original_df = area_df.copy()
 
         # Filter target_df based on the selected establishment sizes
         if selected_establishment_sizes is None:
             selected_establishment_sizes = []
         processed_df = original_df[original_df['Business size'].isin(selected_establishment_sizes)]
-        # print("===============================================================================================")
-        # print("=============DIAG cbp_df")
-        # print(cbp_df.to_markdown())
-        #
-        # print("=============DIAG original_df")
-        # print(original_df.to_markdown())
 
         # Only calculate the state ranking score if filtered_df is NOT empty
         if not processed_df.empty:
-            # Generate a new dataframe using target_df that also includes the calculated ranking score for each state
+            # Generate a new dataframe using target_df that also includes the calculated ranking score for each area
             if score_weight_1 is None or score_weight_2 is None:
                 # if either input is "None", use the default weights
                 score_weight_1 = def_state_ranking_weights["weight_1"]
                 score_weight_2 = def_state_ranking_weights["weight_2"]
             score_weights = {"weight_1": score_weight_1, "weight_2": score_weight_2}
-            processed_df = enhance_df_with_state_ranking_score(processed_df, score_weights)
+            processed_df = enhance_df_with_state_ranking_score(processed_df, score_weights, level)
 
-        # print("=============DIAG processed_df")
-        # print(processed_df.to_markdown())
-        print("=============> processed DF")
-        print(processed_df.to_markdown())
-        return update_choropleth(processed_df, focused_attribute), None
+        return update_choropleth(processed_df, focused_attribute, level, location_mappings[level]), None
 
 
     @app.callback(
         Output("scatter-plot", "figure"),
         Output("loading-output-scatter-plot", "children"),
         Input('choropleth-mapbox', 'selectedData'),
-        Input("establishment-size-checklist", "value"))
-    def update_scatter_plot_view(selected_data, selected_establishment_sizes):
-        # Create a deep copy of the original dataframe which can be freely modified for this callback
-        original_df = cbp_df.copy()
+        Input("establishment-size-checklist", "value"),
+        Input("geography-drill-store", "data"))
+    def update_scatter_plot_view(selected_data, selected_establishment_sizes, drill_path):
+        # Create a deep copy of the selected area's tile which can be freely modified for this callback
+        level, area_df = select_area(geo_levels, drill_path)
+        original_df = area_df.copy()
 
         # Filter target_df based on the selected establishment sizes
         if selected_establishment_sizes is None:
@@ -246,11 +310,10 @@ if __name__ == '__main__':
 
         # If a choropleth map selection was made, filter the data based on that
         if selected_data:
-            print(selected_data)
             # If a data selection is provided, filter target_df accordingly
-            states = [x['location'] for x in selected_data['points']]
-            processed_df = processed_df[processed_df["State code"].isin(states)]
+            areas = [x['customdata'][0] for x in selected_data['points']]
+            processed_df = processed_df[processed_df[level].isin(areas)]
 
-        return update_scatter_plot(processed_df), None
+        return update_scatter_plot(processed_df, level), None
 
-app.run_server(debug=True, dev_tools_ui=True)
+    app.run_server(debug=True, dev_tools_ui=True)
@@ -4,6 +4,64 @@ def_state_ranking_weights = {
     "weight_2": -0.7
 }
 
+# Geography levels the data is aggregated on, ordered from the coarsest to the finest one.
+# Clicking an area on the map drills down to the next level, showing only the areas within the clicked one.
+# A level is only used if the dataset contains a column with the same name (e.g. "County" for county-level CBP data).
+geography_levels = ["Region", "State", "County"]
+
+# Column used to locate the areas of each geography level on the map.
+# Regions are drawn by coloring each of their states with the value of the region.
+geography_location_columns = {
+    "Region": "State code",
+    "State": "State code",
+    "County": "County FIPS"
+}
+
+# Dataset mapping each State to its Region, used if the preprocessed dataset does not already contain a "Region" column
+state_regions_path = "../datasets/sources/state_regions.csv"
+
+# GeoJSON containing the county boundaries (only loaded for the "County" level). It is not part of the repository and
+# can be downloaded from https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json
+# The "id" of each feature must be the 5-digit, zero-padded FIPS code of the county (e.g. "01001"), matching the
+# "County FIPS" column of the dataset.
+county_geojson_path = "../datasets/sources/geojson-counties-fips.json"
+
+# Attributes measured per establishment row, which are summed within each (area, Business size)
+establishment_attributes = ["#Establishments", "Total #employees"]
+
+# Attributes derived from the establishment attributes, recomputed within each (area, Business size) as
+# numerator / denominator
+establishment_ratio_attributes = {
+    "Average #employees": ("Total #employees", "#Establishments")
+}
+
+# Every other attribute describes an area as a whole, regardless of the business size. When rolling up to a coarser
+# area, counts ("#" attributes) are summed, while these ratios are recomputed from the summed counts as
+# numerator / denominator
+area_ratio_attributes = {
+    "(Mid)Senior to total ratio": ("#(Mid)Senior degree holders", "#Bachelor's degree holders")
+}
+
+# Any other area attribute is averaged over the finer areas, weighted by the attribute it is listed with here (where
+# #Establishments is the total of the finer area over all business sizes). "Degree holders to establishments ratio" is
+# weighted by #Establishments, since its numerator (all age groups) is not available in the dataset.
+area_weight_attributes = {
+    "Degree holders to establishments ratio": "#Establishments"
+}
+
+# Area attributes not listed in area_weight_attributes are weighted by #Bachelor's degree holders. E.g. the
+# "Men to women degree holders ratio", "Rate born - exited" and "Average rank" of a Region are averages of the values
+# of its states, weighted by their #Bachelor's degree holders. This is an approximation rather than an exact aggregate
+# (e.g. the "Average rank" of a Region is not the average rank of its universities).
+default_area_weight_attribute = "#Bachelor's degree holders"
+
+# The finest geography level each area attribute is measured at. The datasets joined by data_processing.py are
+# state-level, so e.g. county rows would carry copies of the degree holders of their State. When rolling up from a
+# level finer than this one, the attribute is taken once per coarser area instead of being summed or averaged.
+# Attributes not listed here are measured at the default_area_attribute_level.
+area_attribute_levels = {}
+default_area_attribute_level = "State"
+
 focused_attributes = ["#Establishments",
                       # "Average annual payroll",
                       # "Average first-quarter payroll",
@@ -1,5 +1,51 @@
+import os
+import time
+
+# Taken before Dash is imported, so that the startup figures also cover the import time of the app.
+# With debug mode, Werkzeug's reloader runs the server in a child process that imports the app again. The timestamp of
+# the parent process is passed to it through an environment variable (only set if not already present), so that the
+# figures also cover the startup of the parent process. After a code reload, they are measured from the original start.
+os.environ.setdefault("DASHBOARD_STARTUP_TIME", str(time.time()))
+startup_time = float(os.environ["DASHBOARD_STARTUP_TIME"])
+
 from dash import Dash
+from flask import jsonify, request
 
 
 app = Dash(__name__)
 app.title = "Knowledge Engineering Group 6"
+
+# Seconds from startup until the first request was received by the server (None until that happens)
+time_to_first_request = None
+
+# Seconds from startup until the response of the first callback was finished, i.e. until the dashboard starts drawing
+# its figures (None until that happens)
+time_to_first_update = None
+
+
+@app.server.before_request
+def record_time_to_first_request():
+    global time_to_first_request
+    if time_to_first_request is None:
+        time_to_first_request = time.time() - startup_time
+        print("> Time to first request: {:.3f}s".format(time_to_first_request))
+
+
+@app.server.after_request
+def record_time_to_first_update(response):
+    global time_to_first_update
+    if time_to_first_update is None and request.path == "/_dash-update-component":
+        time_to_first_update = time.time() - startup_time
+        print("> Time to first callback update: {:.3f}s".format(time_to_first_update))
+
+    return response
+
+
+@app.server.route("/startup-metrics")
+def startup_metrics():
+    """
+
+    :return: A JSON response containing the startup figures, so that they can be tracked across changes.
+    """
+    return jsonify({"time_to_first_request": time_to_first_request,
+                    "time_to_first_update": time_to_first_update})
@@ -1,6 +1,6 @@
 from dash import dcc, html
 
-from dashboard.config import focused_attributes, def_state_ranking_weights
+from config import focused_attributes, def_state_ranking_weights
 
 
 def generate_description_card():
@@ -1,5 +1,20 @@
+import sys
+
 import pandas as pd
-import sweetviz as sv
+
+
+def generate_analysis_report(target_df, output_path='final_report.html'):
+    """
+    Generate a sweetviz analysis report of target_df and display it in the browser.
+    sweetviz (and its heavy dependencies) is only imported here, so that runs which skip the report don't pay for it.
+    :param target_df: the dataframe to analyze
+    :param output_path: path of the generated .html report
+    """
+    import sweetviz as sv
+
+    report = sv.analyze(target_df)
+    report.show_html(output_path)
+
 
 # Load the dataset (example: iris dataset)
 cbp_df = pd.read_csv('datasets/sources/CBP2019.CB1900CBP-2023-05-14T012245.csv')
@@ -291,11 +306,9 @@ final_dataset = final_dataset.drop(columns=drop_column_names)
 # print final_dataset in the terminal using markdown
 print(final_dataset.to_markdown())
 
-# Generate the analysis report
-report_1 = sv.analyze(final_dataset)
-
-# Display the report in the browser
-report_1.show_html('final_report.html')
+# Generate the analysis report and display it in the browser (skip it with the "--no-report" argument)
+if "--no-report" not in sys.argv:
+    generate_analysis_report(final_dataset)
 
 print("> Saving preprocessed datasets to .csv files...")
 final_dataset.to_csv('datasets/generated/final_preprocessed.csv', index=False)